@@ -1,26 +1,85 @@
 from asyncio import get_event_loop
-from typing import Coroutine
+from typing import Type
+from uuid import uuid4
 
 from privileges import Privilege, EventsBitValues
 from privileges.bits import Bit
-from privileges.notify.async_notifier import AsyncNotifier
 from privileges.notify.block_notifier import BlockingNotifier
 from privileges.redis.redis import RedisController
 
 
-async def save_redis_callback(o: Privilege):
+def get_redis_controller(o: Privilege) -> RedisController:
     redis_controller = getattr(o, RedisController.attr, None)
     if not isinstance(redis_controller, RedisController):
         raise AttributeError('Ошибка получения RedisController из объекта %r' % o)
     if redis_controller.pool.closed:
         raise ConnectionError('Отсутствует подключение к %r' % redis_controller)
+    return redis_controller
+
+
+REDIS_KEY_ATTR = 'redis_key'
+
+
+def get_redis_key(o: Privilege) -> str:
+    """
+    Ключ узла в Redis. uid не уникален (потомок по умолчанию получает uid родителя),
+    поэтому ключ узла - uid + собственный идентификатор, назначаемый при первом сохранении
+    """
+    key = getattr(o, REDIS_KEY_ATTR, None)
+    if key is None:
+        key = '%s:%s' % (o.uid, uuid4().hex)
+        setattr(o, REDIS_KEY_ATTR, key)
+    return key
+
 
+async def save_redis_callback(o: Privilege):
+    """
+    Сохраняет в Redis только явно заданные биты и ключ родителя (hash по ключу узла).
+    Унаследованные значения вычисляются при чтении, поэтому потомков перезаписывать не нужно
+    """
+    redis_controller = get_redis_controller(o)
+    record = Privilege.as_record(o)
+    if o.parent is not None:
+        parent_key = getattr(o.parent, REDIS_KEY_ATTR, None)
+        if parent_key is None:
+            raise ValueError('Родитель объекта %r не сохранен в Redis' % o)
+        record['parent'] = parent_key
+    key = get_redis_key(o)
     try:
-        await redis_controller.pool.set(o.uid, int(o))
+        # hash заменяется целиком, чтобы не осталось устаревших полей (например, parent)
+        transaction = redis_controller.pool.multi_exec()
+        transaction.delete(key)
+        transaction.hmset_dict(key, record)
+        await transaction.execute()
     except Exception as e:
-        raise ValueError('Ошибка при записи %r по ключу %s: %s' % (o, o.uid, e))
+        raise ValueError('Ошибка при записи %r по ключу %s: %s' % (o, key, e))
     else:
-        print('Сохранено %r по ключу %s' % (o, o.uid))
+        print('Сохранено %r по ключу %s' % (o, key))
+
+
+async def load_redis_privilege(redis_controller: RedisController, key: str, cls: Type[Privilege]) -> Privilege:
+    """
+    Читает из Redis узел по ключу key и всю цепочку его родителей, восстанавливает значения от корня.
+    cls должен позволять добавлять атрибуты (без __slots__, например AsyncRedisPrivileges)
+    """
+    records = []
+    visited = set()
+    while key is not None:
+        if key in visited:
+            raise ValueError('Цикл в цепочке родителей по ключу %s' % key)
+        visited.add(key)
+        record = await redis_controller.pool.hgetall(key)
+        if not record:
+            raise KeyError('Отсутствует запись по ключу %s' % key)
+        records.append((key, record))
+        key = record.get('parent')
+
+    instance = None
+    for key, record in reversed(records):
+        instance = cls.from_record(record, parent=instance)
+        redis_controller.setup(instance)
+        setattr(instance, REDIS_KEY_ATTR, key)
+    return instance
 
 
 def print_callback(o: Privilege):
@@ -40,38 +99,44 @@ class NotifyingPrivileges(Privilege):
 
 class AsyncRedisPrivileges(Privilege):
     """
-    Расширяет интерфейс асинхронными вызовами + добавляет сохранение в Redis при изменении инстанса
+    Расширяет интерфейс асинхронными вызовами + добавляет сохранение в Redis при изменении инстанса.
+    Каждое изменение перезаписывает ровно один ключ - объект, в котором измененный бит задан явно
     """
 
     @classmethod
-    @AsyncNotifier.cm_notify(callback=save_redis_callback)
-    def async_init(cls, *args, redis: RedisController, **kwargs) -> Coroutine:
+    async def async_init(cls, *args, redis: RedisController, **kwargs) -> 'AsyncRedisPrivileges':
         """Создает инстанс и записывает значение в Redis"""
         instance = cls(*args, **kwargs)
         redis.setup(instance)
+        await save_redis_callback(instance)
         return instance
 
-    @AsyncNotifier.notify(callback=save_redis_callback)
-    def set(self, key, value) -> Coroutine:
-        """Уведомляет всех родителей при внесении изменений в привилегию"""
-        return super(AsyncRedisPrivileges, self).set(key, value)
+    async def set(self, key, value) -> None:
+        """Сохраняет в Redis объект, которому принадлежит измененный бит"""
+        super(AsyncRedisPrivileges, self).set(key, value)
+        await save_redis_callback(self.owner(key))
 
     @classmethod
-    @AsyncNotifier.cm_notify(callback=save_redis_callback)
-    def async_create_privilege(cls, *args, redis: RedisController, **kwargs) -> Coroutine:
+    async def async_create_privilege(cls, *args, redis: RedisController, **kwargs) -> 'AsyncRedisPrivileges':
         """Создает инстанс и записывает значение в Redis"""
-        instance = AsyncRedisPrivileges.create_privilege(*args, **kwargs)
+        instance = cls.create_privilege(*args, **kwargs)
         redis.setup(instance)
+        await save_redis_callback(instance)
         return instance
 
     @classmethod
-    @AsyncNotifier.cm_notify(callback=save_redis_callback)
-    def async_from_int(cls, *args, redis: RedisController, **kwargs) -> Coroutine:
+    async def async_from_int(cls, *args, redis: RedisController, **kwargs) -> 'AsyncRedisPrivileges':
         """Создает инстанс из int и записывает значение в Redis"""
-        instance = AsyncRedisPrivileges.from_int(*args, **kwargs)
+        instance = cls.from_int(*args, **kwargs)
         redis.setup(instance)
+        await save_redis_callback(instance)
         return instance
 
+    @classmethod
+    async def async_load(cls, key: str, redis: RedisController) -> 'AsyncRedisPrivileges':
+        """Читает инстанс (вместе с цепочкой родителей) из Redis по ключу узла"""
+        return await load_redis_privilege(redis, key, cls=cls)
+
 
 async def main():
     RedisController.host = 'localhost'
@@ -112,6 +177,10 @@ async def main():
     from_int = await AsyncRedisPrivileges.async_from_int(265, uid='FROM INT', redis=redis)
     assert root == from_int
 
+    # Значения потомков вычисляются при чтении по цепочке родителей
+    loaded = await AsyncRedisPrivileges.async_load(get_redis_key(second_child), redis=redis)
+    assert loaded == second_child
+
     await redis.disconnect()
 
 
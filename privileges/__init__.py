@@ -2,5 +2,7 @@ from privileges import bits
 from privileges import notify
 from privileges.events import EventsBitValues, EventReverser
 from privileges.privileges import PrivilegesEncoder, Privilege
+from privileges.stream import iter_records, dump_ndjson, load_ndjson
 
-__all__ = ['PrivilegesEncoder', 'EventsBitValues', 'EventReverser', 'Privilege', 'bits', 'notify']
+__all__ = ['PrivilegesEncoder', 'EventsBitValues', 'EventReverser', 'Privilege', 'bits', 'notify',
+           'iter_records', 'dump_ndjson', 'load_ndjson']
@@ -90,6 +90,37 @@ class Privilege(ABC):
 
         return cls(bits=bits, uid=uid)
 
+    @classmethod
+    def from_record(
+            cls, record: Dict[str, Any],
+            parent: Optional['Privilege'] = None
+    ):
+        """
+        Фабричный метод создания объекта на основе записи Privilege.as_record.
+        Явно заданные биты берутся из записи, остальные наследуются от parent.
+        parent в записи - ссылка хранилища на родительский узел (ключ, номер строки и т.п.), а не его uid
+        """
+        uid, parent_ref = record['uid'], record.get('parent')
+        if parent_ref is None and parent is not None:
+            raise ValueError('Record %r has no parent, but parent %r specified' % (uid, parent.uid))
+        if parent_ref is not None and parent is None:
+            raise ValueError('Parent %r must be specified for record %r' % (parent_ref, uid))
+
+        mask, bits_value = int(record['mask']), int(record['bits'])
+        for name, value in (('mask', mask), ('bits', bits_value)):
+            if not 0 <= value < 1 << len(EventsBitValues):
+                raise ValueError('%s of record %r must be in [0, %s]' % (
+                    name, uid, (1 << len(EventsBitValues)) - 1
+                ))
+
+        mask = cls.int_to_bits(mask)
+        values = cls.int_to_bits(bits_value)
+        bits = [
+            values[bit.value] if mask[bit.value].bit else None
+            for bit in EventsBitValues
+        ]  # type: List[Optional[Bit]]
+        return cls(bits=bits, uid=uid, parent=parent)
+
     @staticmethod
     def int_to_bits(value: int) -> List[Bit]:
         """Переводит int число в последовательность бит, длиной 10"""
@@ -100,6 +131,36 @@ class Privilege(ABC):
                 bits[bit.value] = Bit.true
         return bits
 
+    @staticmethod
+    def bits_to_int(bits: List[Bit]) -> int:
+        """Переводит последовательность бит, длиной 10, в int число"""
+        return int(''.join(map(lambda bit: str(int(bit.bit)), bits)), base=2)
+
+    @staticmethod
+    def explicit_bits(pr: 'Privilege') -> List[Optional[Bit]]:
+        """Явно заданные биты объекта (None на месте унаследованных от родителя)"""
+        if pr.parent is None:
+            return list(pr.value)
+        return [
+            None if bit is parent_bit else bit
+            for bit, parent_bit in zip(pr.value, pr.parent.value)
+        ]
+
+    @staticmethod
+    def as_record(pr: 'Privilege') -> Dict[str, Any]:
+        """
+        Нормализованное представление для записи в базу: только явно заданные биты.
+        mask - маска явно заданных бит, bits - их значения (унаследованные биты равны 0).
+        uid не идентифицирует узел (потомок по умолчанию получает uid родителя),
+        поэтому ссылку на родителя (поле parent) добавляет хранилище в своих ключах
+        """
+        bits = pr.explicit_bits(pr)
+        return {
+            'uid': pr.uid,
+            'mask': pr.bits_to_int([Bit(bit is not None) for bit in bits]),
+            'bits': pr.bits_to_int([Bit.false if bit is None else bit for bit in bits]),
+        }
+
     @staticmethod
     def as_json(pr: 'Privilege'):
         """Переводит значение в человеко-читаемый вид"""
@@ -111,18 +172,23 @@ class Privilege(ABC):
     @staticmethod
     def as_tree(pr: Optional['Privilege']):
         """Выстраивает все дерево (вверх) до корня"""
-        if pr is None:
-            return
+        chain = []  # type: List[Privilege]
+        while pr is not None:
+            chain.append(pr)
+            pr = pr.parent
 
-        return {
-            'parent': pr.as_tree(pr.parent),
-            'uid': pr.uid,
-            'value': pr.as_json(pr)
-        }
+        tree = None
+        for node in reversed(chain):
+            tree = {
+                'parent': tree,
+                'uid': node.uid,
+                'value': node.as_json(node)
+            }
+        return tree
 
     def __int__(self):
         """Представление в виде числа [0, 1023] (так как задается 10 битами)"""
-        return int(''.join(map(lambda bit: str(int(bit.bit)), self.value)), base=2)
+        return self.bits_to_int(self.value)
 
     def __str__(self):
         return self.__repr__()
@@ -133,7 +199,13 @@ class Privilege(ABC):
         )
 
     def __hash__(self):
-        return hash(dumps(self.as_tree(self), sort_keys=True, cls=PrivilegesEncoder))
+        # по содержимому всей цепочки до корня (как as_tree), но без рекурсии
+        chain = []
+        node = self
+        while node is not None:
+            chain.append((dumps(node.uid, sort_keys=True, default=str), int(node)))
+            node = node.parent
+        return hash(tuple(chain))
 
     def __eq__(self, other: 'Privilege'):
         return self.value == other.value
@@ -166,6 +238,13 @@ class Privilege(ABC):
             raise IndexError
         return self.__getitem__(item)
 
+    def owner(self, key: EventsBitValues) -> 'Privilege':
+        """Возвращает объект (self или предка), в котором бит key задан явно"""
+        node = self
+        while node.parent is not None and node.value[key.value] is node.parent.value[key.value]:
+            node = node.parent
+        return node
+
     @property
     def value(self):
         return self._bits
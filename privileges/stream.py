@@ -0,0 +1,65 @@
+from json import dumps, loads
+from typing import Any, Dict, IO, Iterable, Iterator, List, Tuple, Type
+
+from privileges.privileges import Privilege
+
+
+def iter_records(privileges: Iterable[Privilege]) -> Iterator[Dict[str, Any]]:
+    """
+    Обходит объекты и их предков без рекурсии и отдает записи Privilege.as_record.
+    Каждый объект отдается один раз, родитель всегда раньше потомков.
+    uid не идентифицирует узел, поэтому записи нумеруются (id), а parent ссылается на id родителя.
+    Хранит ссылки на все отданные объекты (O(n) памяти)
+    """
+    written = {}  # type: Dict[int, Tuple[int, Privilege]]
+    for pr in privileges:
+        chain = []  # type: List[Privilege]
+        node = pr
+        while node is not None and id(node) not in written:
+            chain.append(node)
+            node = node.parent
+        for node in reversed(chain):
+            record_id = len(written)
+            record = node.as_record(node)
+            record['id'] = record_id
+            record['parent'] = None if node.parent is None else written[id(node.parent)][0]
+            written[id(node)] = (record_id, node)
+            yield record
+
+
+def dump_ndjson(privileges: Iterable[Privilege], fp: IO[str]) -> int:
+    """
+    Записывает иерархию в fp построчно (JSON Lines), возвращает количество записанных узлов.
+    Не сериализуемые в JSON uid (например, uuid4 по умолчанию) записываются строками
+    """
+    count = 0
+    for record in iter_records(privileges):
+        fp.write(dumps(record, sort_keys=True, default=str))
+        fp.write('\n')
+        count += 1
+    return count
+
+
+def load_ndjson(fp: IO[str], cls: Type[Privilege] = Privilege) -> Iterator[Privilege]:
+    """
+    Построчно читает иерархию из fp (JSON Lines) и отдает восстановленные объекты.
+    Родитель должен встретиться в потоке раньше потомков (как в dump_ndjson).
+    Хранит все прочитанные объекты по id записи (O(n) памяти) для поиска родителей,
+    uid, записанные строками (например, UUID), остаются строками
+    """
+    nodes = {}  # type: Dict[Any, Privilege]
+    for number, line in enumerate(fp, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = loads(line)
+        record_id, parent_id = record.get('id'), record.get('parent')
+        if record_id in nodes:
+            raise ValueError('Line %s: duplicate id %r' % (number, record_id))
+        parent = None
+        if parent_id is not None:
+            parent = nodes.get(parent_id)
+            if parent is None:
+                raise ValueError('Line %s: parent %r of %r not found' % (number, parent_id, record_id))
+        nodes[record_id] = cls.from_record(record, parent=parent)
+        yield nodes[record_id]